@@ -6,6 +6,7 @@ from datetime import datetime
 import requests
 from fastapi import FastAPI, HTTPException, Depends, Header, UploadFile, File, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Tuple
 from slowapi import Limiter, _rate_limit_exceeded_handler
@@ -62,7 +63,7 @@ UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 async def initialize_database():
     """Initialize database if it doesn't exist"""
     import traceback
-    from utils.setup_database import create_database, populate_database
+    from utils.setup_database import create_database, create_indexes, populate_database
     
     db_path = Path("data/database/college.db")
     db_path.parent.mkdir(parents=True, exist_ok=True)
@@ -72,6 +73,7 @@ async def initialize_database():
         try:
             conn = create_database(str(db_path))
             populate_database(conn)
+            create_indexes(conn)
             conn.close()
             print("✅ Database initialized successfully with 30 students!")
             print(f"✅ Database file: {db_path}")
@@ -509,7 +511,8 @@ def get_profile(request: Request, student_id: Optional[str] = Depends(get_curren
     if not profile.get("found"):
         raise HTTPException(status_code=404, detail="Profile not found")
     
-    return profile
+    # Plain dicts/primitives already; skip jsonable_encoder's extra copy.
+    return ORJSONResponse(profile)
 
 
 @app.get("/api/chat/history")
@@ -661,7 +664,7 @@ def get_student_schedule(
     from utils.automation import get_today_schedule
     
     result = get_today_schedule(student_id, target_date=date)
-    return result
+    return ORJSONResponse(result)
 
 
 @app.get("/api/student/fees")
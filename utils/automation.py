@@ -12,7 +12,8 @@ Functions:
 
 Data sources:
 - SQLite DB: data/database/college.db (attendance, enrollments, courses, faculty, exams, fees)
-- Course catalog CSV: data/catalogs/course_catalog_2025_2026.csv (meeting_times, instructor)
+- Course catalog CSV: data/catalogs/course_catalog_2025_2026.csv (meeting_times, instructor),
+  materialized into the course_catalog table at import
 """
 
 from __future__ import annotations
@@ -20,37 +21,184 @@ from __future__ import annotations
 import csv
 import sqlite3
 from datetime import date as date_cls
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List
+from threading import Lock
+from typing import Any, Dict, Iterator, List
 
 from utils import notifications
 
 DB_PATH = Path("data/database/college.db")
 CATALOG_PATH = Path("data/catalogs/course_catalog_2025_2026.csv")
 
+_ALLOWED_DOCS = frozenset({"Bonafide", "ID Card", "Transcript", "NOC"})
+_FAST_ETA_DOCS = frozenset({"Bonafide", "ID Card"})
+_UNSUPPORTED_DOC_MSG = f"Unsupported document type. Choose from: {', '.join(sorted(_ALLOWED_DOCS))}"
+
+# Shared with function_schemas, which bootstraps the same table on its pool.
+# Databases from before ux_appt_slot may hold double bookings from the old
+# SELECT-then-INSERT race; keep the earliest per slot so the index can build.
+# The sqlite_master probe is constant, so once the index exists the DELETE
+# ends without scanning the table.
+APPOINTMENTS_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS appointments (
+    appointment_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    student_id TEXT NOT NULL,
+    faculty_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    time_slot TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'confirmed',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+DELETE FROM appointments
+WHERE NOT EXISTS (SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'ux_appt_slot')
+  AND appointment_id NOT IN (
+      SELECT MIN(appointment_id) FROM appointments GROUP BY faculty_id, date, time_slot
+  );
+CREATE UNIQUE INDEX IF NOT EXISTS ux_appt_slot ON appointments(faculty_id, date, time_slot);
+"""
 
-def _get_conn():
-    """Create a new database connection (thread-safe for FastAPI)."""
-    if not DB_PATH.exists():
-        raise FileNotFoundError(f"Database not found at {DB_PATH}")
-    return sqlite3.connect(DB_PATH, check_same_thread=False)
+_SCHEMA_SQL = """
+BEGIN;
+""" + APPOINTMENTS_SCHEMA_SQL + """
+CREATE TABLE IF NOT EXISTS leave_applications (
+    ticket_id TEXT PRIMARY KEY,
+    student_id TEXT NOT NULL,
+    from_date TEXT NOT NULL,
+    to_date TEXT NOT NULL,
+    reason TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'submitted',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS document_requests (
+    ticket_id TEXT PRIMARY KEY,
+    student_id TEXT NOT NULL,
+    document_type TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'submitted',
+    eta_days INTEGER NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS course_catalog (
+    course_code TEXT PRIMARY KEY,
+    meeting_times TEXT,
+    instructor TEXT,
+    source_mtime REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_leave_student ON leave_applications(student_id);
+CREATE INDEX IF NOT EXISTS idx_docreq_student ON document_requests(student_id);
+COMMIT;
+"""
+
+_SCHEMA_READY = False
 
 
-def _load_catalog_meeting_times() -> Dict[str, Dict[str, str]]:
-    catalog: Dict[str, Dict[str, str]] = {}
+def _sync_course_catalog(conn: sqlite3.Connection) -> None:
+    """Load the catalog CSV into course_catalog when the table is empty or stale."""
     if not CATALOG_PATH.exists():
-        return catalog
+        return
+    mtime = CATALOG_PATH.stat().st_mtime
+    (loaded_mtime,) = conn.execute("SELECT MAX(source_mtime) FROM course_catalog").fetchone()
+    if loaded_mtime == mtime:
+        return
+
+    rows = []
     with open(CATALOG_PATH, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
+        for row in csv.DictReader(f):
             code = row.get("course_code") or row.get("course_id")
             if not code:
                 continue
-            catalog[code.strip()] = {
-                "meeting_times": row.get("meeting_times", ""),
-                "catalog_instructor": row.get("instructor", ""),
+            rows.append((code.strip(), row.get("meeting_times", ""), row.get("instructor", ""), mtime))
+
+    with conn:
+        conn.execute("DELETE FROM course_catalog")
+        conn.executemany(
+            "INSERT OR REPLACE INTO course_catalog (course_code, meeting_times, instructor, source_mtime) "
+            "VALUES (?, ?, ?, ?)",
+            rows,
+        )
+
+
+def _init_schema() -> None:
+    """Create request tables/indexes once per process instead of on every call."""
+    global _SCHEMA_READY
+    if _SCHEMA_READY or not DB_PATH.exists():
+        return
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        conn.executescript(_SCHEMA_SQL)
+        _sync_course_catalog(conn)
+    finally:
+        conn.close()
+    _SCHEMA_READY = True
+
+
+_DB_CHECKED = False
+_DB_LOCK = Lock()
+
+
+def _check_db() -> None:
+    """Probe for the DB file once; it does not disappear at runtime."""
+    global _DB_CHECKED
+    with _DB_LOCK:
+        if _DB_CHECKED:
+            return
+        if not DB_PATH.exists():
+            raise FileNotFoundError(f"Database not found at {DB_PATH}")
+        # DB may be created after import (API startup hook); finish schema lazily.
+        _init_schema()
+        _DB_CHECKED = True
+
+
+def _get_conn():
+    """Create a new database connection (thread-safe for FastAPI)."""
+    if not _DB_CHECKED:
+        _check_db()
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+_init_schema()
+
+_FETCH_SIZE = 256
+
+
+def _iter_rows(cur: sqlite3.Cursor) -> Iterator[sqlite3.Row]:
+    """Stream cursor rows in fetchmany batches instead of materializing fetchall()."""
+    while True:
+        rows = cur.fetchmany(_FETCH_SIZE)
+        if not rows:
+            return
+        yield from rows
+
+
+@lru_cache(maxsize=1)
+def _courses_map() -> Dict[str, Dict[str, Any]]:
+    """Load the near-static courses table once; hot queries enrich from it instead of JOINing."""
+    conn = _get_conn()
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT c.course_id, c.course_name, c.department, c.credits, c.semester,
+                   c.faculty_id, f.name AS faculty_name
+            FROM courses c
+            LEFT JOIN faculty f ON c.faculty_id = f.faculty_id
+            """
+        )
+        return {
+            row["course_id"]: {
+                "name": row["course_name"],
+                "department": row["department"],
+                "credits": row["credits"],
+                "semester": row["semester"],
+                "faculty_id": row["faculty_id"],
+                "faculty_name": row["faculty_name"],
             }
-    return catalog
+            for row in _iter_rows(cur)
+        }
+    finally:
+        conn.close()
 
 
 def _get_student_contact(student_id: str) -> Dict[str, str]:
@@ -66,20 +214,20 @@ def _get_student_contact(student_id: str) -> Dict[str, str]:
         conn.close()
     if not row:
         return {}
-    return {"name": row[0], "email": row[1], "phone": row[2]}
+    return {"name": row["name"], "email": row["email"], "phone": row["phone"]}
 
 
 def check_attendance(student_id: str, course_id: str) -> Dict[str, Any]:
     """Return attendance summary and alert flag for a student in a course."""
+    course = _courses_map().get(course_id)
     conn = _get_conn()
     try:
         cur = conn.cursor()
         cur.execute(
             """
-            SELECT a.total_classes, a.attended, a.percentage, c.course_name
-            FROM attendance a
-            JOIN courses c ON a.course_id = c.course_id
-            WHERE a.student_id = ? AND a.course_id = ?
+            SELECT total_classes, attended, percentage
+            FROM attendance
+            WHERE student_id = ? AND course_id = ?
             """,
             (student_id, course_id),
         )
@@ -87,13 +235,16 @@ def check_attendance(student_id: str, course_id: str) -> Dict[str, Any]:
     finally:
         conn.close()
 
-    if not row:
+    if not row or not course:
         return {
             "found": False,
             "message": f"No attendance record for {student_id} in {course_id}.",
         }
 
-    total_classes, attended, percentage, course_name = row
+    total_classes = row["total_classes"]
+    attended = row["attended"]
+    percentage = row["percentage"]
+    course_name = course["name"]
     alert = percentage < 75.0
     message = f"Your attendance in {course_name}: {percentage:.0f}% ({attended}/{total_classes} classes)"
     if alert:
@@ -114,41 +265,39 @@ def check_attendance(student_id: str, course_id: str) -> Dict[str, Any]:
 
 def get_today_schedule(student_id: str, target_date: str | None = None) -> Dict[str, Any]:
     """Return classes for a student on a given date (uses catalog meeting_times as schedule)."""
+    courses = _courses_map()
+    today = target_date or date_cls.today().isoformat()
+
+    schedule: List[Dict[str, Any]] = []
     conn = _get_conn()
     try:
         cur = conn.cursor()
         cur.execute(
             """
-            SELECT e.course_id, c.course_name, c.department, c.semester, f.name AS faculty_name
+            SELECT e.course_id, cc.meeting_times, cc.instructor AS catalog_instructor
             FROM enrollments e
-            JOIN courses c ON e.course_id = c.course_id
-            JOIN faculty f ON c.faculty_id = f.faculty_id
+            LEFT JOIN course_catalog cc ON cc.course_code = e.course_id
             WHERE e.student_id = ?
             """,
             (student_id,),
         )
-        rows = cur.fetchall()
-
+        for row in _iter_rows(cur):
+            course_id = row["course_id"]
+            course = courses.get(course_id)
+            if not course:
+                continue
+            schedule.append({
+                "course_id": course_id,
+                "course_name": course["name"],
+                "department": course["department"],
+                "semester": course["semester"],
+                "date": today,
+                "meeting_times": row["meeting_times"] or "Time not listed",
+                "faculty_name": course["faculty_name"],
+                "catalog_instructor": row["catalog_instructor"] or "",
+            })
     finally:
         conn.close()
-    catalog = _load_catalog_meeting_times()
-    today = target_date or date_cls.today().isoformat()
-
-    schedule: List[Dict[str, Any]] = []
-    for course_id, course_name, department, semester, faculty_name in rows:
-        cat = catalog.get(course_id, {})
-        meeting_times = cat.get("meeting_times", "")
-        catalog_instructor = cat.get("catalog_instructor", "")
-        schedule.append({
-            "course_id": course_id,
-            "course_name": course_name,
-            "department": department,
-            "semester": semester,
-            "date": today,
-            "meeting_times": meeting_times or "Time not listed",
-            "faculty_name": faculty_name,
-            "catalog_instructor": catalog_instructor,
-        })
 
     return {
         "student_id": student_id,
@@ -181,7 +330,12 @@ def check_fee_status(student_id: str) -> Dict[str, Any]:
     if not row:
         return {"found": False, "message": f"No fee record for {student_id}."}
 
-    total, paid, due, due_date, status, semester = row
+    total = row["total_fees"]
+    paid = row["paid_amount"]
+    due = row["due_amount"]
+    due_date = row["due_date"]
+    status = row["status"]
+    semester = row["semester"]
     message = f"Fees for {semester}: total {total:.2f}, paid {paid:.2f}, due {due:.2f}, due date {due_date} (status: {status})."
     return {
         "found": True,
@@ -198,15 +352,15 @@ def check_fee_status(student_id: str) -> Dict[str, Any]:
 
 def get_grades(student_id: str, course_id: str, semester: str) -> Dict[str, Any]:
     """Return grade and credits for a student/course/semester using enrollments + courses."""
+    course = _courses_map().get(course_id)
     conn = _get_conn()
     try:
         cur = conn.cursor()
         cur.execute(
             """
-            SELECT e.grade, c.credits, c.course_name
-            FROM enrollments e
-            JOIN courses c ON e.course_id = c.course_id
-            WHERE e.student_id = ? AND e.course_id = ? AND e.semester = ?
+            SELECT grade
+            FROM enrollments
+            WHERE student_id = ? AND course_id = ? AND semester = ?
             """,
             (student_id, course_id, semester),
         )
@@ -214,10 +368,12 @@ def get_grades(student_id: str, course_id: str, semester: str) -> Dict[str, Any]
 
     finally:
         conn.close()
-    if not row:
+    if not row or not course:
         return {"found": False, "message": f"No grade found for {student_id} in {course_id} ({semester})."}
 
-    grade, credits, course_name = row
+    grade = row["grade"]
+    credits = course["credits"]
+    course_name = course["name"]
     message = f"Grade for {course_name} ({semester}): {grade or 'N/A'} | Credits: {credits}"
     return {
         "found": True,
@@ -236,44 +392,25 @@ def book_faculty_appointment(student_id: str, faculty_id: str, date: str, time_s
     conn = _get_conn()
     try:
         cur = conn.cursor()
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS appointments (
-                appointment_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id TEXT NOT NULL,
-                faculty_id TEXT NOT NULL,
-                date TEXT NOT NULL,
-                time_slot TEXT NOT NULL,
-                status TEXT NOT NULL DEFAULT 'confirmed',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-            """
-        )
-        conn.commit()
-
-        cur.execute(
-            """
-            SELECT 1 FROM appointments
-            WHERE faculty_id = ? AND date = ? AND time_slot = ?
-            LIMIT 1
-            """,
-            (faculty_id, date, time_slot),
-        )
-        if cur.fetchone():
-            return {"ok": False, "message": "Slot unavailable; choose another time."}
-
+        # ux_appt_slot makes the slot check and insert one atomic statement.
         cur.execute(
             """
             INSERT INTO appointments (student_id, faculty_id, date, time_slot)
             VALUES (?, ?, ?, ?)
+            ON CONFLICT DO NOTHING
+            RETURNING appointment_id
             """,
             (student_id, faculty_id, date, time_slot),
         )
+        row = cur.fetchone()
         conn.commit()
-        appt_id = cur.lastrowid
 
     finally:
         conn.close()
+    if row is None:
+        return {"ok": False, "message": "Slot unavailable; choose another time."}
+    appt_id = row["appointment_id"]
+
     contact = _get_student_contact(student_id)
     if contact.get("email"):
         faculty_name = faculty_id
@@ -283,7 +420,7 @@ def book_faculty_appointment(student_id: str, faculty_id: str, date: str, time_s
             cur.execute("SELECT name FROM faculty WHERE faculty_id = ?", (faculty_id,))
             row = cur.fetchone()
             if row:
-                faculty_name = row[0]
+                faculty_name = row["name"]
         finally:
             conn.close()
         tpl = notifications.tpl_appointment_confirmation(contact.get("name", student_id), faculty_name, date, time_slot)
@@ -305,21 +442,6 @@ def apply_for_leave(student_id: str, from_date: str, to_date: str, reason: str)
     conn = _get_conn()
     try:
         cur = conn.cursor()
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS leave_applications (
-                ticket_id TEXT PRIMARY KEY,
-                student_id TEXT NOT NULL,
-                from_date TEXT NOT NULL,
-                to_date TEXT NOT NULL,
-                reason TEXT NOT NULL,
-                status TEXT NOT NULL DEFAULT 'submitted',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-            """
-        )
-        conn.commit()
-
         ticket = f"LV-{student_id}-{from_date.replace('-', '')}-{to_date.replace('-', '')}"
         cur.execute(
             """
@@ -351,6 +473,7 @@ def apply_for_leave(student_id: str, from_date: str, to_date: str, reason: str)
 
 def get_exam_schedule(student_id: str, semester: str) -> Dict[str, Any]:
     """Return upcoming exams for the student's enrolled courses in a semester."""
+    courses = _courses_map()
     conn = _get_conn()
     try:
         cur = conn.cursor()
@@ -362,7 +485,7 @@ def get_exam_schedule(student_id: str, semester: str) -> Dict[str, Any]:
             """,
             (student_id, semester),
         )
-        course_ids = [row[0] for row in cur.fetchall()]
+        course_ids = [row["course_id"] for row in _iter_rows(cur)]
 
         if not course_ids:
             return {"found": False, "message": f"No enrollments for {student_id} in {semester}."}
@@ -370,32 +493,24 @@ def get_exam_schedule(student_id: str, semester: str) -> Dict[str, Any]:
         placeholders = ",".join("?" * len(course_ids))
         cur.execute(
             f"""
-            SELECT ex.course_id, c.course_name, ex.exam_date, ex.exam_time, ex.room_number, ex.exam_type
-            FROM exams ex
-            JOIN courses c ON ex.course_id = c.course_id
-            WHERE ex.course_id IN ({placeholders}) AND ex.semester = ?
-            ORDER BY ex.exam_date, ex.exam_time
+            SELECT course_id, exam_date, exam_time, room_number AS room, exam_type
+            FROM exams
+            WHERE course_id IN ({placeholders}) AND semester = ?
+            ORDER BY exam_date, exam_time
             """,
             (*course_ids, semester),
         )
-        exams = cur.fetchall()
+        items: List[Dict[str, Any]] = [
+            {**dict(row), "course_name": courses[row["course_id"]]["name"]}
+            for row in _iter_rows(cur)
+            if row["course_id"] in courses
+        ]
 
     finally:
         conn.close()
-    if not exams:
+    if not items:
         return {"found": False, "message": f"No exams scheduled for {semester}."}
 
-    items: List[Dict[str, Any]] = []
-    for course_id, course_name, exam_date, exam_time, room, exam_type in exams:
-        items.append({
-            "course_id": course_id,
-            "course_name": course_name,
-            "exam_date": exam_date,
-            "exam_time": exam_time,
-            "room": room,
-            "exam_type": exam_type,
-        })
-
     return {
         "found": True,
         "student_id": student_id,
@@ -408,28 +523,13 @@ def get_exam_schedule(student_id: str, semester: str) -> Dict[str, Any]:
 
 def request_document(student_id: str, document_type: str) -> Dict[str, Any]:
     """Create a document request ticket and return ETA."""
-    allowed = {"Bonafide", "ID Card", "Transcript", "NOC"}
-    if document_type not in allowed:
-        return {"ok": False, "message": f"Unsupported document type. Choose from: {', '.join(sorted(allowed))}"}
+    if document_type not in _ALLOWED_DOCS:
+        return {"ok": False, "message": _UNSUPPORTED_DOC_MSG}
 
     conn = _get_conn()
     try:
         cur = conn.cursor()
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS document_requests (
-                ticket_id TEXT PRIMARY KEY,
-                student_id TEXT NOT NULL,
-                document_type TEXT NOT NULL,
-                status TEXT NOT NULL DEFAULT 'submitted',
-                eta_days INTEGER NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-            """
-        )
-        conn.commit()
-
-        eta = 2 if document_type in {"Bonafide", "ID Card"} else 5
+        eta = 2 if document_type in _FAST_ETA_DOCS else 5
         ticket = f"DOC-{student_id}-{document_type.replace(' ', '').upper()}"
 
         cur.execute(
@@ -465,80 +565,73 @@ def request_document(student_id: str, document_type: str) -> Dict[str, Any]:
 
 def get_student_profile(student_id: str) -> Dict[str, Any]:
     """Fetch complete student profile with enrolled courses and attendance summary."""
+    enrolled_courses: List[Dict[str, Any]] = []
+    attendance_summary: List[Dict[str, Any]] = []
+    courses = _courses_map()
     conn = _get_conn()
     try:
         cur = conn.cursor()
-        
+
         # Basic student info
         cur.execute(
             "SELECT student_id, name, department, year, email, phone FROM students WHERE student_id = ? LIMIT 1",
             (student_id,),
         )
         student_row = cur.fetchone()
-        
+
         if not student_row:
             return {"found": False, "message": f"Student {student_id} not found."}
-        
+
         # Enrolled courses
         cur.execute(
             """
-            SELECT e.course_id, c.course_name, c.credits, e.semester, e.grade
-            FROM enrollments e
-            JOIN courses c ON e.course_id = c.course_id
-            WHERE e.student_id = ?
-            ORDER BY e.semester DESC
+            SELECT course_id, semester, grade
+            FROM enrollments
+            WHERE student_id = ?
+            ORDER BY semester DESC
             """,
             (student_id,),
         )
-        enrollments = cur.fetchall()
-        
+        for row in _iter_rows(cur):
+            course = courses.get(row["course_id"])
+            if not course:
+                continue
+            enrolled_courses.append({
+                "course_id": row["course_id"],
+                "course_name": course["name"],
+                "credits": course["credits"],
+                "semester": row["semester"],
+                "grade": row["grade"] or "In Progress",
+            })
+
         # Attendance summary across all courses
         cur.execute(
             """
-            SELECT a.course_id, c.course_name, a.total_classes, a.attended, a.percentage
-            FROM attendance a
-            JOIN courses c ON a.course_id = c.course_id
-            WHERE a.student_id = ?
+            SELECT course_id, total_classes, attended, percentage
+            FROM attendance
+            WHERE student_id = ?
             """,
             (student_id,),
         )
-        attendance_rows = cur.fetchall()
-    
+        for row in _iter_rows(cur):
+            course = courses.get(row["course_id"])
+            if not course:
+                continue
+            attendance_summary.append({
+                **dict(row),
+                "course_name": course["name"],
+                "alert": row["percentage"] < 75.0,
+            })
+
     finally:
         conn.close()
-    
-    enrolled_courses: List[Dict[str, Any]] = []
-    for course_id, course_name, credits, semester, grade in enrollments:
-        enrolled_courses.append({
-            "course_id": course_id,
-            "course_name": course_name,
-            "credits": credits,
-            "semester": semester,
-            "grade": grade or "In Progress",
-        })
-    
-    attendance_summary: List[Dict[str, Any]] = []
-    for course_id, course_name, total_classes, attended, percentage in attendance_rows:
-        attendance_summary.append({
-            "course_id": course_id,
-            "course_name": course_name,
-            "total_classes": total_classes,
-            "attended": attended,
-            "percentage": percentage,
-            "alert": percentage < 75.0,
-        })
-    
+
     return {
         "found": True,
-        "student_id": student_row[0],
-        "name": student_row[1],
-        "department": student_row[2],
-        "year": student_row[3],
-        "email": student_row[4],
-        "phone": student_row[5],
+        **dict(student_row),
         "enrolled_courses": enrolled_courses,
         "attendance_summary": attendance_summary,
-        "message": f"Profile for {student_row[1]} ({student_id})",
+        "message": f"Profile for {student_row['name']} ({student_id})",
     }
 
 
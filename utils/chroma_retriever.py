@@ -3,9 +3,20 @@ Enhanced Retriever using ChromaDB vector store.
 Supports collection-specific queries with metadata filtering.
 """
 
-from typing import List, Dict, Any, Optional
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple
 import chromadb
+import numpy as np
 from chromadb.config import Settings
+from chromadb.utils import embedding_functions
+
+logger = logging.getLogger(__name__)
+
+# Fields _query_collection actually reads; never pull stored embeddings back.
+_QUERY_INCLUDE = ["documents", "metadatas", "distances"]
 
 
 class ChromaRetriever:
@@ -15,6 +26,12 @@ class ChromaRetriever:
         self.chroma_dir = chroma_dir
         self.client = None
         self.collections = {}
+        # Same default embedder Chroma uses for our collections; lets us embed a
+        # query once and reuse the vector across every collection.
+        self._embed_fn = embedding_functions.DefaultEmbeddingFunction()
+        # Per-instance memo caches: repeated questions skip embedding + HNSW search.
+        self._embed_cached = lru_cache(maxsize=256)(self._embed)
+        self._cached_search = lru_cache(maxsize=512)(self._query_collection_cached)
         self.initialize()
 
     def initialize(self) -> bool:
@@ -33,90 +50,192 @@ class ChromaRetriever:
             for name in collection_names:
                 try:
                     self.collections[name] = self.client.get_collection(name=name)
-                except:
-                    pass
+                except Exception as e:
+                    logger.debug("Collection %s missing: %s", name, e)
 
             if self.collections:
-                print(f"✓ Loaded {len(self.collections)} collections from Chroma")
+                logger.info("Loaded %d collections from Chroma", len(self.collections))
                 return True
             else:
-                print("⚠ No collections found. Run: python -m utils.setup_vectordb")
+                logger.warning("No collections found. Run: python -m utils.setup_vectordb")
                 return False
         except Exception as e:
-            print(f"❌ Error initializing Chroma: {e}")
+            logger.error("Error initializing Chroma: %s", e)
             return False
 
+    def _embed(self, query: str) -> tuple:
+        embedding = self._embed_fn([query])[0]
+        return tuple(embedding.tolist() if hasattr(embedding, "tolist") else embedding)
+
+    def embed_query(self, query: str) -> Optional[List[float]]:
+        """Embed a query with the collections' embedding function (memoized per text)."""
+        try:
+            return list(self._embed_cached(query))
+        except Exception as e:
+            logger.warning("Error embedding query: %s", e)
+            return None
+
+    def embed_queries(self, queries: List[str]) -> List[Optional[List[float]]]:
+        """Embed several queries in one batched call to the embedding function."""
+        if not queries:
+            return []
+        try:
+            embeddings = self._embed_fn(list(queries))
+        except Exception as e:
+            logger.warning("Error embedding queries: %s", e)
+            return [None] * len(queries)
+        return [e.tolist() if hasattr(e, "tolist") else list(e) for e in embeddings]
+
+    def _query_collection(
+        self,
+        query: str,
+        collection_name: str,
+        top_k: int,
+        where_filter: Optional[Dict],
+        query_embedding: Optional[List[float]],
+    ) -> Tuple[Tuple[str, Tuple[Tuple[str, Any], ...], float], ...]:
+        """Run one Chroma query; returns immutable rows so they can be cached."""
+        collection = self.collections[collection_name]
+        if query_embedding is not None:
+            results = collection.query(
+                query_embeddings=[query_embedding],
+                n_results=top_k,
+                where=where_filter,
+                include=_QUERY_INCLUDE,
+            )
+        else:
+            results = collection.query(
+                query_texts=[query],
+                n_results=top_k,
+                where=where_filter,
+                include=_QUERY_INCLUDE,
+            )
+
+        if not results or not results.get("documents"):
+            return ()
+
+        docs = results["documents"][0]
+        distances = results.get("distances")
+        metadatas = results.get("metadatas")
+        metas = metadatas[0] if metadatas else [{}] * len(docs)
+
+        # Convert distance to similarity (0-1, higher = better); zero/missing distance -> 0.5
+        dists = np.asarray(distances[0] if distances else [0.0] * len(docs), dtype=np.float64)
+        sims = np.where(dists == 0, 0.5, 1.0 - dists * 0.5).tolist()
+
+        return tuple(
+            (doc, tuple((metadata or {}).items()), similarity)
+            for doc, metadata, similarity in zip(docs, metas, sims)
+        )
+
+    def _query_collection_cached(
+        self,
+        collection_name: str,
+        query: str,
+        top_k: int,
+        filter_key: str,
+    ) -> Tuple[Tuple[str, Tuple[Tuple[str, Any], ...], float], ...]:
+        where_filter = json.loads(filter_key) if filter_key else None
+        query_embedding = self.embed_query(query)
+        return self._query_collection(query, collection_name, top_k, where_filter, query_embedding)
+
     def search_collection(
         self,
         query: str,
         collection_name: str,
         top_k: int = 5,
         where_filter: Optional[Dict] = None,
+        query_embedding: Optional[List[float]] = None,
     ) -> List[Dict]:
-        """Search a specific collection."""
+        """Search a specific collection (optionally with a precomputed query embedding).
+
+        Results are memoized per (collection, query, top_k, filter) for the
+        lifetime of the retriever. Calls with an explicit ``query_embedding``
+        or a non-JSON-serializable filter bypass the cache.
+        """
         if collection_name not in self.collections:
-            print(f"⚠ Collection {collection_name} not found")
+            logger.warning("Collection %s not found", collection_name)
             return []
 
-        collection = self.collections[collection_name]
         try:
-            results = collection.query(
-                query_texts=[query],
-                n_results=top_k,
-                where=where_filter,
-            )
+            filter_key: Optional[str] = json.dumps(where_filter, sort_keys=True) if where_filter else ""
+        except (TypeError, ValueError):
+            filter_key = None
 
-            # Format results
-            retrieved = []
-            if results and results.get("documents"):
-                for i, doc in enumerate(results["documents"][0]):
-                    distance = results["distances"][0][i] if results.get("distances") else 0
-                    metadata = results["metadatas"][0][i] if results.get("metadatas") else {}
-                    # Convert distance to similarity (0-1, higher = better)
-                    similarity = 1 - (distance / 2) if distance else 0.5
-                    
-                    retrieved.append({
-                        "content": doc,
-                        "metadata": metadata,
-                        "similarity": similarity,
-                        "collection": collection_name,
-                    })
-            return retrieved
+        try:
+            if query_embedding is None and filter_key is not None:
+                rows = self._cached_search(collection_name, query, top_k, filter_key)
+            else:
+                rows = self._query_collection(query, collection_name, top_k, where_filter, query_embedding)
         except Exception as e:
-            print(f"⚠ Error searching {collection_name}: {e}")
+            logger.warning("Error searching %s: %s", collection_name, e)
             return []
 
+        return [
+            {
+                "content": doc,
+                "metadata": dict(metadata),
+                "similarity": similarity,
+                "collection": collection_name,
+            }
+            for doc, metadata, similarity in rows
+        ]
+
     def search_all(
         self,
         query: str,
         top_k: int = 5,
+        where_filter: Optional[Dict] = None,
+        query_embedding: Optional[List[float]] = None,
+        collection_names: Optional[List[str]] = None,
     ) -> Dict[str, List[Dict]]:
-        """Search across all collections."""
-        results = {}
-        for collection_name in self.collections:
-            results[collection_name] = self.search_collection(query, collection_name, top_k)
-        return results
+        """Search across collections, embedding the query once and querying in parallel.
+
+        ``where_filter`` is passed to every collection's Chroma query, so
+        metadata filtering happens inside the vector store. A precomputed
+        ``query_embedding`` is reused as-is for every collection.
+        ``collection_names`` limits the search to a subset (default: all).
+        """
+        if collection_names is None:
+            collection_names = list(self.collections)
+        else:
+            collection_names = [name for name in collection_names if name in self.collections]
+        if not collection_names:
+            return {}
+
+        if query_embedding is None:
+            # Warm the embedding memo so every collection reuses the same vector.
+            self.embed_query(query)
+        # HNSW search runs outside the GIL, so per-collection queries overlap in threads.
+        with ThreadPoolExecutor(max_workers=len(collection_names)) as executor:
+            futures = {
+                collection_name: executor.submit(
+                    self.search_collection, query, collection_name, top_k, where_filter, query_embedding
+                )
+                for collection_name in collection_names
+            }
+            return {collection_name: future.result() for collection_name, future in futures.items()}
 
     def format_results(self, results: List[Dict], max_chars: int = 120) -> str:
         """Format search results for display."""
         if not results:
             return "No results found."
 
-        output = f"\n{'='*70}\nRetrieved {len(results)} documents:\n{'='*70}\n"
+        parts: List[str] = [f"\n{'='*70}\nRetrieved {len(results)} documents:\n{'='*70}\n"]
         for i, result in enumerate(results, 1):
             metadata = result.get("metadata", {})
             similarity = result.get("similarity", 0)
             collection = result.get("collection", "unknown")
             content = result["content"][:max_chars].replace("\n", " ")
-            
-            output += f"\n[{i}] {collection} | Similarity: {similarity:.3f}\n"
+
+            parts.append(f"\n[{i}] {collection} | Similarity: {similarity:.3f}\n")
             if metadata:
                 meta_str = " | ".join(f"{k}: {v}" for k, v in list(metadata.items())[:3])
-                output += f"    Metadata: {meta_str}\n"
-            output += f"    Content: {content}...\n"
-        
-        output += f"\n{'='*70}\n"
-        return output
+                parts.append(f"    Metadata: {meta_str}\n")
+            parts.append(f"    Content: {content}...\n")
+
+        parts.append(f"\n{'='*70}\n")
+        return "".join(parts)
 
 
 def run_comprehensive_tests() -> None:
@@ -217,4 +336,5 @@ def run_comprehensive_tests() -> None:
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     run_comprehensive_tests()
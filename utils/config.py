@@ -24,7 +24,10 @@ class Settings(BaseSettings):
     model_config = {
         "env_file": ".env",
         "env_file_encoding": "utf-8",
-        "protected_namespaces": ("settings_",)  # Fix model_name conflict
+        "protected_namespaces": ("settings_",),  # Fix model_name conflict
+        # Settings are read-only after load; skip per-assignment validation.
+        "frozen": True,
+        "validate_assignment": False,
     }
 
 
@@ -34,8 +37,16 @@ def get_settings() -> Settings:
     return Settings()  # type: ignore[arg-type]
 
 
+_ENSURED = False
+
+
 def ensure_required_keys(settings: Settings) -> None:
+    # Validation and directory creation only need to happen once per process.
+    global _ENSURED
+    if _ENSURED:
+        return
     if settings.vector_store == "pinecone" and not settings.pinecone_api_key:
         raise ValueError("Pinecone selected but PINECONE_API_KEY is missing")
     if settings.vector_store == "chroma":
         os.makedirs(settings.chroma_dir, exist_ok=True)
+    _ENSURED = True
@@ -1,27 +1,86 @@
 """Conversation history and feedback utilities.
 
 Features:
-- Save and retrieve conversation history per student
+- Save and retrieve conversation history per student (single or bulk, streamed reads)
 - Track feedback (thumbs up/down)
 - Analytics for most asked questions
 """
 
 from __future__ import annotations
 
-import json
-import sqlite3
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
 
-DB_PATH = Path("data/database/college.db")
+import orjson
 
+from utils.db import get_sqlite_pool
 
-def _get_db_connection():
-    """Create a new database connection (thread-safe)."""
-    if not DB_PATH.exists():
-        raise FileNotFoundError(f"Database not found at {DB_PATH}")
-    return sqlite3.connect(DB_PATH, check_same_thread=False)
+DB_PATH = Path("data/database/college.db")
+POOL = get_sqlite_pool(DB_PATH, pool_size=8)
+
+# Hoisted so every call hands sqlite3 the identical string and hits the
+# per-connection prepared-statement cache instead of re-parsing.
+_SQL_INSERT_CONVERSATION = """
+INSERT INTO conversation_history
+(student_id, user_query, assistant_reply, sources, actions, model, created_at)
+VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+"""
+_SQL_SELECT_HISTORY = """
+SELECT
+    conversation_id, user_query, assistant_reply, sources, actions, model, created_at
+FROM conversation_history
+WHERE student_id = ?
+ORDER BY created_at DESC
+LIMIT ? OFFSET ?
+"""
+_SQL_UPSERT_FEEDBACK = """
+INSERT INTO feedback (conversation_id, student_id, rating, comment)
+VALUES (?, ?, ?, ?)
+ON CONFLICT(conversation_id, student_id)
+DO UPDATE SET rating = excluded.rating,
+              comment = excluded.comment,
+              created_at = CURRENT_TIMESTAMP
+RETURNING feedback_id
+"""
+_SQL_MOST_ASKED = """
+SELECT
+    user_query,
+    COUNT(*) as frequency,
+    AVG(CASE WHEN f.rating IS NOT NULL THEN f.rating ELSE 0 END) as avg_rating
+FROM conversation_history ch
+LEFT JOIN feedback f ON ch.conversation_id = f.conversation_id
+WHERE ch.created_at >= ?
+GROUP BY ch.query_norm
+ORDER BY frequency DESC
+LIMIT ?
+"""
+_SQL_STATS = """
+SELECT
+    COUNT(DISTINCT ch.conversation_id) AS total_conversations,
+    COUNT(DISTINCT DATE(ch.created_at)) AS active_days,
+    COUNT(DISTINCT ch.student_id) AS unique_students,
+    COALESCE(SUM(CASE WHEN f.rating = 1 THEN 1 ELSE 0 END), 0) AS positive_feedback,
+    COALESCE(SUM(CASE WHEN f.rating = -1 THEN 1 ELSE 0 END), 0) AS negative_feedback
+FROM conversation_history ch
+LEFT JOIN feedback f ON f.conversation_id = ch.conversation_id
+WHERE (? IS NULL OR ch.student_id = ?)
+"""
+_SQL_RECENT_FEEDBACK = """
+SELECT
+    f.feedback_id,
+    f.conversation_id,
+    f.student_id,
+    f.rating,
+    f.comment,
+    f.created_at,
+    ch.user_query,
+    ch.assistant_reply
+FROM feedback f
+JOIN conversation_history ch ON f.conversation_id = ch.conversation_id
+ORDER BY f.created_at DESC
+LIMIT ?
+"""
 
 
 def save_conversation(
@@ -33,28 +92,78 @@ def save_conversation(
     model: Optional[str] = None
 ) -> int:
     """Save a conversation to history. Returns conversation_id."""
-    conn = _get_db_connection()
-    try:
+    with POOL.connection(readonly=False) as conn:
         cur = conn.cursor()
         cur.execute(
-            """
-            INSERT INTO conversation_history 
-            (student_id, user_query, assistant_reply, sources, actions, model, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-            """,
+            _SQL_INSERT_CONVERSATION,
             (
                 student_id,
                 user_query,
                 assistant_reply,
-                json.dumps(sources) if sources else None,
-                json.dumps(actions) if actions else None,
+                orjson.dumps(sources).decode() if sources else None,
+                orjson.dumps(actions).decode() if actions else None,
                 model
             )
         )
         conn.commit()
         return cur.lastrowid
-    finally:
-        conn.close()
+
+
+def save_conversations_bulk(rows: Iterable[Sequence[Any]]) -> int:
+    """Save many conversations in one transaction. Returns rows inserted.
+
+    Each row is (student_id, user_query, assistant_reply[, sources[, actions[, model]]]),
+    matching save_conversation's positional arguments.
+    """
+    def _params(row: Sequence[Any]):
+        student_id, user_query, assistant_reply, *rest = row
+        sources, actions, model = (list(rest) + [None, None, None])[:3]
+        return (
+            student_id,
+            user_query,
+            assistant_reply,
+            orjson.dumps(sources).decode() if sources else None,
+            orjson.dumps(actions).decode() if actions else None,
+            model
+        )
+
+    with POOL.connection(readonly=False) as conn:
+        cur = conn.cursor()
+        cur.execute("BEGIN")
+        try:
+            cur.executemany(
+                _SQL_INSERT_CONVERSATION,
+                (_params(row) for row in rows)
+            )
+        except Exception:
+            conn.rollback()
+            raise
+        conn.commit()
+        return cur.rowcount
+
+
+def iter_conversation_history(
+    student_id: str,
+    limit: int = 20,
+    offset: int = 0
+) -> Iterator[Dict[str, Any]]:
+    """Stream conversation history for a student, newest first.
+
+    Rows are decoded as they are consumed; the pooled reader is held until
+    the generator is exhausted or closed.
+    """
+    with POOL.connection() as conn:
+        cur = conn.execute(_SQL_SELECT_HISTORY, (student_id, limit, offset))
+        for row in cur:
+            yield {
+                "conversation_id": row["conversation_id"],
+                "user_query": row["user_query"],
+                "assistant_reply": row["assistant_reply"],
+                "sources": orjson.loads(row["sources"]) if row["sources"] else [],
+                "actions": orjson.loads(row["actions"]) if row["actions"] else [],
+                "model": row["model"],
+                "created_at": row["created_at"]
+            }
 
 
 def get_conversation_history(
@@ -63,37 +172,7 @@ def get_conversation_history(
     offset: int = 0
 ) -> List[Dict[str, Any]]:
     """Retrieve conversation history for a student."""
-    conn = _get_db_connection()
-    try:
-        cur = conn.cursor()
-        cur.execute(
-            """
-            SELECT 
-                conversation_id, user_query, assistant_reply, sources, actions, model, created_at
-            FROM conversation_history
-            WHERE student_id = ?
-            ORDER BY created_at DESC
-            LIMIT ? OFFSET ?
-            """,
-            (student_id, limit, offset)
-        )
-        rows = cur.fetchall()
-    finally:
-        conn.close()
-    
-    conversations: List[Dict[str, Any]] = []
-    for row in rows:
-        conversations.append({
-            "conversation_id": row[0],
-            "user_query": row[1],
-            "assistant_reply": row[2],
-            "sources": json.loads(row[3]) if row[3] else [],
-            "actions": json.loads(row[4]) if row[4] else [],
-            "model": row[5],
-            "created_at": row[6]
-        })
-    
-    return conversations
+    return list(iter_conversation_history(student_id, limit, offset))
 
 
 def save_feedback(
@@ -106,68 +185,29 @@ def save_feedback(
     if rating not in {1, -1}:
         raise ValueError("Rating must be 1 (thumbs up) or -1 (thumbs down)")
     
-    conn = _get_db_connection()
-    try:
+    with POOL.connection(readonly=False) as conn:
         cur = conn.cursor()
-        # Check if feedback already exists for this conversation
+        # One statement instead of SELECT-then-UPDATE/INSERT.
         cur.execute(
-            "SELECT feedback_id FROM feedback WHERE conversation_id = ? AND student_id = ?",
-            (conversation_id, student_id)
+            _SQL_UPSERT_FEEDBACK,
+            (conversation_id, student_id, rating, comment)
         )
-        existing = cur.fetchone()
-        
-        if existing:
-            # Update existing feedback
-            cur.execute(
-                """
-                UPDATE feedback 
-                SET rating = ?, comment = ?, created_at = CURRENT_TIMESTAMP
-                WHERE feedback_id = ?
-                """,
-                (rating, comment, existing[0])
-            )
-            conn.commit()
-            return existing[0]
-        else:
-            # Insert new feedback
-            cur.execute(
-                """
-                INSERT INTO feedback (conversation_id, student_id, rating, comment)
-                VALUES (?, ?, ?, ?)
-                """,
-                (conversation_id, student_id, rating, comment)
-            )
-            conn.commit()
-            return cur.lastrowid
-    finally:
-        conn.close()
+        feedback_id = cur.fetchone()[0]
+        conn.commit()
+        return feedback_id
 
 
 def get_most_asked_questions(limit: int = 10, days: int = 30) -> List[Dict[str, Any]]:
     """Get most frequently asked questions in the last N days."""
-    conn = _get_db_connection()
-    try:
+    with POOL.connection() as conn:
         cur = conn.cursor()
         cutoff_date = (datetime.now() - timedelta(days=days)).isoformat()
         
         cur.execute(
-            """
-            SELECT 
-                user_query,
-                COUNT(*) as frequency,
-                AVG(CASE WHEN f.rating IS NOT NULL THEN f.rating ELSE 0 END) as avg_rating
-            FROM conversation_history ch
-            LEFT JOIN feedback f ON ch.conversation_id = f.conversation_id
-            WHERE ch.created_at >= ?
-            GROUP BY LOWER(user_query)
-            ORDER BY frequency DESC
-            LIMIT ?
-            """,
+            _SQL_MOST_ASKED,
             (cutoff_date, limit)
         )
         rows = cur.fetchall()
-    finally:
-        conn.close()
     
     questions: List[Dict[str, Any]] = []
     for row in rows:
@@ -182,108 +222,42 @@ def get_most_asked_questions(limit: int = 10, days: int = 30) -> List[Dict[str,
 
 def get_conversation_stats(student_id: Optional[str] = None) -> Dict[str, Any]:
     """Get conversation statistics (global or per student)."""
-    conn = _get_db_connection()
-    try:
+    with POOL.connection() as conn:
         cur = conn.cursor()
-        
-        if student_id:
-            # Student-specific stats
-            cur.execute(
-                """
-                SELECT 
-                    COUNT(*) as total_conversations,
-                    COUNT(DISTINCT DATE(created_at)) as active_days,
-                    AVG(LENGTH(user_query)) as avg_query_length
-                FROM conversation_history
-                WHERE student_id = ?
-                """,
-                (student_id,)
-            )
-            row = cur.fetchone()
-            
-            cur.execute(
-                """
-                SELECT COUNT(*) as positive_feedback
-                FROM feedback f
-                JOIN conversation_history ch ON f.conversation_id = ch.conversation_id
-                WHERE ch.student_id = ? AND f.rating = 1
-                """,
-                (student_id,)
-            )
-            positive = cur.fetchone()[0]
-            
-            cur.execute(
-                """
-                SELECT COUNT(*) as negative_feedback
-                FROM feedback f
-                JOIN conversation_history ch ON f.conversation_id = ch.conversation_id
-                WHERE ch.student_id = ? AND f.rating = -1
-                """,
-                (student_id,)
-            )
-            negative = cur.fetchone()[0]
-        else:
-            # Global stats
-            cur.execute(
-                """
-                SELECT 
-                    COUNT(*) as total_conversations,
-                    COUNT(DISTINCT student_id) as unique_students,
-                    AVG(LENGTH(user_query)) as avg_query_length
-                FROM conversation_history
-                """
-            )
-            row = cur.fetchone()
-            
-            cur.execute("SELECT COUNT(*) FROM feedback WHERE rating = 1")
-            positive = cur.fetchone()[0]
-            
-            cur.execute("SELECT COUNT(*) FROM feedback WHERE rating = -1")
-            negative = cur.fetchone()[0]
-    finally:
-        conn.close()
+        # One scan + one join; DISTINCT keeps totals right when a conversation
+        # carries more than one feedback row.
+        cur.execute(
+            _SQL_STATS,
+            (student_id, student_id)
+        )
+        row = cur.fetchone()
     
+    positive = row[3]
+    negative = row[4]
     stats = {
-        "total_conversations": row[0] if row else 0,
+        "total_conversations": row[0],
         "positive_feedback": positive,
         "negative_feedback": negative,
         "feedback_ratio": round(positive / (positive + negative), 2) if (positive + negative) > 0 else 0.0
     }
     
     if student_id:
-        stats["active_days"] = row[1] if row else 0
+        stats["active_days"] = row[1]
     else:
-        stats["unique_students"] = row[1] if row else 0
+        stats["unique_students"] = row[2]
     
     return stats
 
 
 def get_recent_feedback(limit: int = 10) -> List[Dict[str, Any]]:
     """Get recent feedback with conversation details."""
-    conn = _get_db_connection()
-    try:
+    with POOL.connection() as conn:
         cur = conn.cursor()
         cur.execute(
-            """
-            SELECT 
-                f.feedback_id,
-                f.conversation_id,
-                f.student_id,
-                f.rating,
-                f.comment,
-                f.created_at,
-                ch.user_query,
-                ch.assistant_reply
-            FROM feedback f
-            JOIN conversation_history ch ON f.conversation_id = ch.conversation_id
-            ORDER BY f.created_at DESC
-            LIMIT ?
-            """,
+            _SQL_RECENT_FEEDBACK,
             (limit,)
         )
         rows = cur.fetchall()
-    finally:
-        conn.close()
     
     feedback_list: List[Dict[str, Any]] = []
     for row in rows:
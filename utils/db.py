@@ -1,7 +1,10 @@
 """Database utilities with simple SQLite connection pooling and safe query helpers.
 
 Features:
-- Connection pooling for SQLite (thread-safe queue)
+- Connection pooling for SQLite: one writer plus a queue of read-only readers
+- WAL journal + tuned PRAGMAs on every pooled connection
+- Covering indexes for the hot history/feedback queries (ensure_indexes)
+- One-time schema bootstrap on the writer (bootstrap_schema)
 - Context manager for acquiring/releasing connections
 - Parameterized queries to avoid SQL injection
 - Helper functions: fetch_one, fetch_all, execute, executemany
@@ -12,26 +15,157 @@ Note: For PostgreSQL, extend this module to use psycopg2/asyncpg with proper DSN
 from __future__ import annotations
 
 import sqlite3
-from contextlib import contextmanager
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
 from queue import Queue, Empty
 from threading import Lock
-from typing import Any, Iterable, List, Optional, Tuple
+from typing import Any, ContextManager, Iterable, List, Optional, Tuple, Union
+
+# Applied to every pooled connection. WAL lets readers proceed while a writer
+# commits; synchronous=NORMAL is durable across app crashes in WAL mode.
+# foreign_keys stays at SQLite's default (off): callers such as
+# save_conversation("guest", ...) write rows with no matching students row.
+_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -64000",  # 64 MiB per connection
+    "PRAGMA mmap_size = 268435456",  # 256 MiB
+)
+
+
+# (table, name, DDL) for the predicates used by conversation_history.py.
+# appointments(faculty_id, date) is already covered by automation's ux_appt_slot.
+_INDEXES = (
+    ("conversation_history", "idx_ch_student_created",
+     "CREATE INDEX IF NOT EXISTS idx_ch_student_created ON conversation_history(student_id, created_at DESC)"),
+    ("conversation_history", "idx_ch_created",
+     "CREATE INDEX IF NOT EXISTS idx_ch_created ON conversation_history(created_at)"),
+    # Groups most-asked questions without evaluating LOWER() per row.
+    ("conversation_history", "idx_ch_qnorm_created",
+     "CREATE INDEX IF NOT EXISTS idx_ch_qnorm_created ON conversation_history(query_norm, created_at)"),
+    ("feedback", "idx_fb_rating",
+     "CREATE INDEX IF NOT EXISTS idx_fb_rating ON feedback(rating)"),
+    # Conflict target for the save_feedback upsert; its leading column also
+    # serves the feedback -> conversation_history joins.
+    ("feedback", "uq_feedback_conv_student",
+     "CREATE UNIQUE INDEX IF NOT EXISTS uq_feedback_conv_student ON feedback(conversation_id, student_id)"),
+)
+
+# (table, column, DDL) added to databases created before the column existed.
+# SQLite can only ALTER-add VIRTUAL generated columns; the index above stores
+# the computed value, so lookups never recompute it.
+_COLUMNS = (
+    ("conversation_history", "query_norm",
+     "ALTER TABLE conversation_history ADD COLUMN query_norm TEXT "
+     "GENERATED ALWAYS AS (LOWER(user_query)) VIRTUAL"),
+)
+
+# Run before creating the named index. Older databases may hold duplicate
+# feedback rows from the SELECT-then-INSERT race; keep the newest of each.
+_INDEX_PREP = {
+    "uq_feedback_conv_student": (
+        "DELETE FROM feedback WHERE feedback_id NOT IN "
+        "(SELECT MAX(feedback_id) FROM feedback GROUP BY conversation_id, student_id)"
+    ),
+}
+
+
+# Per-connection prepared-statement cache (sqlite3 default is 128); the hot
+# modules keep their SQL as module constants so lookups hit it.
+_CACHED_STATEMENTS = 256
+
+# PRAGMA optimize is cheap but not free; run it every N pooled writes (and at
+# close) rather than after each one.
+_OPTIMIZE_EVERY = 1000
+
+
+def _configure_connection(conn: sqlite3.Connection) -> None:
+    for pragma in _PRAGMAS:
+        conn.execute(pragma)
+
+
+def ensure_indexes(conn: sqlite3.Connection) -> bool:
+    """Create missing columns/indexes on existing tables, then refresh planner stats.
+
+    Returns True once every indexed table exists (nothing left to retry).
+    """
+    existing = {
+        (row[0], row[1])
+        for row in conn.execute("SELECT type, name FROM sqlite_master WHERE type IN ('table', 'index')")
+    }
+    for table, column, ddl in _COLUMNS:
+        if ("table", table) in existing:
+            # table_xinfo (unlike table_info) also lists generated columns
+            columns = {row[1] for row in conn.execute(f"PRAGMA table_xinfo({table})")}
+            if column not in columns:
+                conn.execute(ddl)
+                conn.commit()
+    missing = [
+        (name, ddl) for table, name, ddl in _INDEXES
+        if ("table", table) in existing and ("index", name) not in existing
+    ]
+    if missing:
+        for name, ddl in missing:
+            if name in _INDEX_PREP:
+                conn.execute(_INDEX_PREP[name])
+            conn.execute(ddl)
+        # The planner ignores new indexes until sqlite_stat1 has rows for them.
+        conn.execute("ANALYZE")
+        conn.commit()
+    return all(("table", table) in existing for table, _, _ in _INDEXES)
 
 
 class SQLiteConnectionPool:
+    """A single write connection guarded by a lock plus N read-only connections.
+
+    Under WAL, readers never block the writer (or each other), so analytics
+    queries can run while conversations are being saved.
+    """
+
     def __init__(self, db_path: Path, pool_size: int = 5) -> None:
         self.db_path = db_path
         self.pool_size = max(1, pool_size)
         self._pool: Queue[sqlite3.Connection] = Queue(maxsize=self.pool_size)
         self._lock = Lock()
+        self._write_lock = Lock()
+        self._writes = 0
+        # Pooled connections are handed to whichever worker thread asks next.
+        # The writer is opened first so the file (and WAL mode) exist before
+        # the read-only connections attach.
+        self._write_conn = sqlite3.connect(
+            self.db_path, check_same_thread=False, cached_statements=_CACHED_STATEMENTS
+        )
+        self._write_conn.row_factory = sqlite3.Row
+        _configure_connection(self._write_conn)
+        # Tables may be created after the pool (e.g. at app startup), so the
+        # writer retries until they all exist.
+        self._indexed = ensure_indexes(self._write_conn)
+        read_uri = f"{self.db_path.resolve().as_uri()}?mode=ro"
         for _ in range(self.pool_size):
-            conn = sqlite3.connect(self.db_path)
+            conn = sqlite3.connect(
+                read_uri, uri=True, check_same_thread=False, cached_statements=_CACHED_STATEMENTS
+            )
             conn.row_factory = sqlite3.Row
+            _configure_connection(conn)
             self._pool.put(conn)
 
     @contextmanager
-    def connection(self) -> sqlite3.Connection:
+    def connection(self, readonly: bool = True) -> sqlite3.Connection:
+        if not readonly:
+            with self._write_lock:
+                if not self._indexed:
+                    self._indexed = ensure_indexes(self._write_conn)
+                try:
+                    yield self._write_conn
+                except BaseException:
+                    # Never leave the shared writer mid-transaction holding the lock
+                    self._write_conn.rollback()
+                    raise
+                self._writes += 1
+                if self._writes % _OPTIMIZE_EVERY == 0:
+                    self._write_conn.execute("PRAGMA optimize")
+            return
         conn: Optional[sqlite3.Connection] = None
         try:
             conn = self._pool.get(timeout=5)
@@ -48,6 +182,9 @@ class SQLiteConnectionPool:
                 except Empty:
                     break
                 conn.close()
+        with self._write_lock:
+            self._write_conn.execute("PRAGMA optimize")
+            self._write_conn.close()
 
 
 def get_sqlite_pool(db_path: str | Path, pool_size: int = 5) -> SQLiteConnectionPool:
@@ -56,27 +193,53 @@ def get_sqlite_pool(db_path: str | Path, pool_size: int = 5) -> SQLiteConnection
     return SQLiteConnectionPool(path, pool_size=pool_size)
 
 
-def fetch_one(conn: sqlite3.Connection, query: str, params: Tuple[Any, ...] = ()) -> Optional[sqlite3.Row]:
-    cur = conn.cursor()
-    cur.execute(query, params)
-    return cur.fetchone()
+
+def bootstrap_schema(pool: SQLiteConnectionPool, script: str) -> None:
+    """Run idempotent DDL once on the pool's writer (call at import time)."""
+    with pool.connection(readonly=False) as conn:
+        conn.executescript(script)
+
+Target = Union[sqlite3.Connection, SQLiteConnectionPool]
+
+
+def _acquire(target: Target, readonly: bool) -> ContextManager[sqlite3.Connection]:
+    """Use a caller-held connection as-is, or borrow the right one from a pool."""
+    if isinstance(target, SQLiteConnectionPool):
+        return target.connection(readonly=readonly)
+    return nullcontext(target)
+
+
+def fetch_one(
+    conn: Target, query: str, params: Tuple[Any, ...] = (), readonly: bool = True
+) -> Optional[sqlite3.Row]:
+    with _acquire(conn, readonly) as c:
+        cur = c.cursor()
+        cur.execute(query, params)
+        return cur.fetchone()
 
 
-def fetch_all(conn: sqlite3.Connection, query: str, params: Tuple[Any, ...] = ()) -> List[sqlite3.Row]:
-    cur = conn.cursor()
-    cur.execute(query, params)
-    return cur.fetchall()
+def fetch_all(
+    conn: Target, query: str, params: Tuple[Any, ...] = (), readonly: bool = True
+) -> List[sqlite3.Row]:
+    with _acquire(conn, readonly) as c:
+        cur = c.cursor()
+        cur.execute(query, params)
+        return cur.fetchall()
 
 
-def execute(conn: sqlite3.Connection, query: str, params: Tuple[Any, ...] = ()) -> int:
-    cur = conn.cursor()
-    cur.execute(query, params)
-    conn.commit()
-    return cur.rowcount
+def execute(conn: Target, query: str, params: Tuple[Any, ...] = (), readonly: bool = False) -> int:
+    with _acquire(conn, readonly) as c:
+        cur = c.cursor()
+        cur.execute(query, params)
+        c.commit()
+        return cur.rowcount
 
 
-def executemany(conn: sqlite3.Connection, query: str, params: Iterable[Tuple[Any, ...]]) -> int:
-    cur = conn.cursor()
-    cur.executemany(query, params)
-    conn.commit()
-    return cur.rowcount
+def executemany(
+    conn: Target, query: str, params: Iterable[Tuple[Any, ...]], readonly: bool = False
+) -> int:
+    with _acquire(conn, readonly) as c:
+        cur = c.cursor()
+        cur.executemany(query, params)
+        c.commit()
+        return cur.rowcount
@@ -9,25 +9,38 @@ Includes:
 
 from __future__ import annotations
 
+import copy
 import json
+import time
+from collections import OrderedDict
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
 
 from utils import automation
-from utils.db import get_sqlite_pool
+from utils.db import bootstrap_schema, get_sqlite_pool
 
 DB_PATH = Path("data/database/college.db")
 POOL = get_sqlite_pool(DB_PATH)
+bootstrap_schema(POOL, automation.APPOINTMENTS_SCHEMA_SQL)
 
+_STUDENT_TTL_SECONDS = 300
 
-def student_exists(student_id: str) -> bool:
-    if not DB_PATH.exists():
-        return False
+
+@lru_cache(maxsize=4096)
+def _student_exists_cached(student_id: str, bucket: int) -> bool:
+    # `bucket` changes every TTL window, so stale entries simply age out of the LRU.
     with POOL.connection() as conn:
         cur = conn.cursor()
         cur.execute("SELECT 1 FROM students WHERE student_id = ? LIMIT 1", (student_id,))
-        found = cur.fetchone() is not None
-    return found
+        return cur.fetchone() is not None
+
+
+def student_exists(student_id: str) -> bool:
+    if not DB_PATH.exists():
+        return False
+    return _student_exists_cached(student_id, int(time.time()) // _STUDENT_TTL_SECONDS)
 
 
 def get_available_slots(faculty_id: str, date: str) -> List[str]:
@@ -43,20 +56,6 @@ def get_available_slots(faculty_id: str, date: str) -> List[str]:
 
     with POOL.connection() as conn:
         cur = conn.cursor()
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS appointments (
-                appointment_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id TEXT NOT NULL,
-                faculty_id TEXT NOT NULL,
-                date TEXT NOT NULL,
-                time_slot TEXT NOT NULL,
-                status TEXT NOT NULL DEFAULT 'confirmed',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-            """
-        )
-        conn.commit()
         cur.execute(
             "SELECT time_slot FROM appointments WHERE faculty_id = ? AND date = ?",
             (faculty_id, date),
@@ -169,8 +168,55 @@ FUNCTION_SCHEMAS: List[Dict[str, Any]] = [
 ]
 
 
+# Read-only tools whose answers may be reused briefly; writes always hit the DB.
+_CACHEABLE_TOOLS = frozenset(
+    {"check_attendance", "get_today_schedule", "check_fee_status", "get_grades", "get_exam_schedule"}
+)
+_TOOL_CACHE_TTL_SECONDS = 60
+_TOOL_CACHE_MAXSIZE = 2048
+_TOOL_CACHE: "OrderedDict[Tuple[Any, ...], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+_TOOL_CACHE_LOCK = Lock()
+
+
+def _tool_cache_key(name: str, args: Dict[str, Any]) -> Optional[Tuple[Any, ...]]:
+    if name not in _CACHEABLE_TOOLS:
+        return None
+    key = (name, tuple(sorted(args.items())))
+    try:
+        hash(key)
+    except TypeError:  # nested lists/dicts from the model; just don't cache
+        return None
+    return key
+
+
 def execute_function(name: str, args: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
     """Execute a function by name with validation. Returns (result, actions)."""
+    key = _tool_cache_key(name, args)
+    if key is not None:
+        now = time.monotonic()
+        with _TOOL_CACHE_LOCK:
+            hit = _TOOL_CACHE.get(key)
+            if hit is not None and hit[0] > now:
+                _TOOL_CACHE.move_to_end(key)
+            else:
+                hit = None
+        if hit is not None:
+            # Callers may mutate the result; hand out a copy, never the cached dict
+            return copy.deepcopy(hit[1]), []
+
+    result, actions = _dispatch(name, args)
+
+    # Failures (invalid student, execution errors) are never cached
+    if key is not None and result.get("ok", True):
+        with _TOOL_CACHE_LOCK:
+            _TOOL_CACHE[key] = (time.monotonic() + _TOOL_CACHE_TTL_SECONDS, copy.deepcopy(result))
+            _TOOL_CACHE.move_to_end(key)
+            if len(_TOOL_CACHE) > _TOOL_CACHE_MAXSIZE:
+                _TOOL_CACHE.popitem(last=False)
+    return result, actions
+
+
+def _dispatch(name: str, args: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
     actions: List[str] = []
 
     # Student validation where applicable
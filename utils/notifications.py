@@ -2,24 +2,109 @@
 
 This module is intentionally lightweight: it logs payloads instead of
 sending real messages. Wire to SMTP/SendGrid/Twilio by replacing the
-`send_email`/`send_sms` implementations.
+`_do_send_email`/`_do_send_sms` implementations.
+
+`send_email`/`send_sms` never block on delivery: payloads go onto a bounded
+queue drained by a single daemon worker, so a slow provider cannot stall the
+request path. `send_email_bulk` queues a whole batch as one job so it can go
+out over a single provider session. Call `flush()` to wait for everything
+queued so far.
 """
 
 from __future__ import annotations
 
-from typing import Dict
+import logging
+import time
+from functools import lru_cache
+from queue import Full, Queue
+from threading import Thread
+from typing import Any, Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+_NOTIF_QUEUE: "Queue[Tuple[Callable[..., Any], Tuple[Any, ...]]]" = Queue(maxsize=10_000)
+_MAX_ATTEMPTS = 3
+_RETRY_BACKOFF_SECONDS = 0.5
 
 
-def send_email(to: str, subject: str, body: str, provider: str = "smtp") -> Dict[str, str]:
+def _do_send_email(to: str, subject: str, body: str, provider: str) -> None:
     # Stub implementation: replace with SMTP/SendGrid client as needed.
     print(f"[email:{provider}] to={to} subject={subject}\n{body}\n")
-    return {"ok": True, "provider": provider, "to": to, "subject": subject}
 
 
-def send_sms(to: str, body: str, provider: str = "twilio") -> Dict[str, str]:
+def _do_send_email_bulk(messages: List[Dict[str, str]], provider: str) -> None:
+    # Stub implementation: one provider session for the whole batch, i.e. a
+    # single smtplib.SMTP connection reused across sendmail() calls, or one
+    # SendGrid /v3/mail/send request with a `personalizations` entry per message.
+    for message in messages:
+        _do_send_email(message["to"], message["subject"], message["body"], provider)
+
+
+def _do_send_sms(to: str, body: str, provider: str) -> None:
     # Stub implementation: replace with Twilio/etc.
     print(f"[sms:{provider}] to={to}\n{body}\n")
-    return {"ok": True, "provider": provider, "to": to}
+
+
+def _worker() -> None:
+    while True:
+        send, args = _NOTIF_QUEUE.get()
+        try:
+            for attempt in range(1, _MAX_ATTEMPTS + 1):
+                try:
+                    send(*args)
+                    break
+                except Exception as e:
+                    if attempt == _MAX_ATTEMPTS:
+                        logger.error("Notification %s failed after %d attempts: %s", send.__name__, attempt, e)
+                    else:
+                        time.sleep(_RETRY_BACKOFF_SECONDS * attempt)
+        finally:
+            _NOTIF_QUEUE.task_done()
+
+
+@lru_cache(maxsize=1)
+def _start_worker() -> Thread:
+    thread = Thread(target=_worker, name="notifications", daemon=True)
+    thread.start()
+    return thread
+
+
+def _enqueue(send: Callable[..., Any], *args: Any) -> bool:
+    _start_worker()
+    try:
+        _NOTIF_QUEUE.put_nowait((send, args))
+        return True
+    except Full:
+        logger.warning("Notification queue full; dropping %s", send.__name__)
+        return False
+
+
+def flush() -> None:
+    """Block until every queued notification has been handled."""
+    _NOTIF_QUEUE.join()
+
+
+def send_email(to: str, subject: str, body: str, provider: str = "smtp") -> Dict[str, Any]:
+    queued = _enqueue(_do_send_email, to, subject, body, provider)
+    return {"ok": queued, "queued": queued, "provider": provider, "to": to, "subject": subject}
+
+
+def send_email_bulk(messages: List[Dict[str, str]], provider: str = "smtp") -> List[Dict[str, Any]]:
+    """Queue many emails (dicts with to/subject/body) as one delivery job.
+
+    The batch is sent over a single provider session instead of one
+    handshake per recipient.
+    """
+    queued = _enqueue(_do_send_email_bulk, list(messages), provider)
+    return [
+        {"ok": queued, "queued": queued, "provider": provider, "to": m["to"], "subject": m["subject"]}
+        for m in messages
+    ]
+
+
+def send_sms(to: str, body: str, provider: str = "twilio") -> Dict[str, Any]:
+    queued = _enqueue(_do_send_sms, to, body, provider)
+    return {"ok": queued, "queued": queued, "provider": provider, "to": to}
 
 
 # Templates
@@ -2,18 +2,23 @@
 Step 6: Retrieval System tests using Chroma collections with metadata filters.
 """
 
-from typing import Dict, List
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional
 
 from utils.chroma_retriever import ChromaRetriever
 
 
 def _flatten_results(all_results: Dict[str, List[Dict]]) -> List[Dict]:
-    """Combine cross-collection results into a single ranked list."""
-    combined: List[Dict] = []
+    """Combine cross-collection results into a single ranked list.
+
+    Each per-collection list comes back nearest-first, so a k-way merge is
+    enough; no full re-sort is needed.
+    """
     for collection, items in all_results.items():
         for item in items:
-            combined.append({**item, "collection": collection})
-    return sorted(combined, key=lambda r: r.get("similarity", 0), reverse=True)
+            item.setdefault("collection", collection)
+    return list(heapq.merge(*all_results.values(), key=lambda r: -r.get("similarity", 0)))
 
 
 def _run_single_query(
@@ -23,27 +28,66 @@ def _run_single_query(
     collection: str,
     where_filter: Dict | None,
     top_k: int = 3,
-) -> None:
-    print(f"\n[Query] {title}")
-    print(f"Text   : {query}")
+    query_embedding: List[float] | None = None,
+) -> str:
+    """Run one scenario and return its report (printed by the caller, in order)."""
+    lines = [f"\n[Query] {title}", f"Text   : {query}"]
     if where_filter:
-        print(f"Filter : {where_filter}")
+        lines.append(f"Filter : {where_filter}")
 
-    results = retriever.search_collection(
-        query=query,
-        collection_name=collection,
-        top_k=top_k,
-        where_filter=where_filter,
+    # Over-fetch from the target collection with the filter pushed into
+    # Chroma; the other collections are only searched if it comes up short.
+    fetch_k = top_k * 3
+    hits = retriever.search_collection(
+        query, collection, top_k=fetch_k, where_filter=where_filter, query_embedding=query_embedding
     )
-
-    if not results:
-        print("  No direct hits in collection; trying cross-collection fallback...")
-        results = _flatten_results(retriever.search_all(query, top_k=top_k))
+    results = _flatten_results({collection: hits})[:top_k]
+
+    if len(results) < top_k:
+        lines.append("  Too few direct hits in collection; topping up from other collections...")
+        others = retriever.search_all(
+            query,
+            top_k=fetch_k,
+            where_filter=where_filter,
+            query_embedding=query_embedding,
+            collection_names=[name for name in retriever.collections if name != collection],
+        )
+        results += _flatten_results(others)[: top_k - len(results)]
 
     if results:
-        print(retriever.format_results(results, max_chars=220))
+        lines.append(retriever.format_results(results, max_chars=220))
     else:
-        print("  No results found across collections.\n")
+        lines.append("  No results found across collections.\n")
+    return "\n".join(lines)
+
+
+class Scenario(NamedTuple):
+    title: str
+    query: str
+    collection: str
+    where: Optional[Dict]
+
+
+_STEP6_SCENARIOS = (
+    Scenario(
+        "Who is the HOD of Computer Science?",
+        "Who is the head of department for Computer Science?",
+        "faculty_info",
+        {"department": {"$eq": "Computer Science"}},
+    ),
+    Scenario(
+        "What is the syllabus for Database Management?",
+        "What is the syllabus for the Database Management course?",
+        "college_courses",
+        {"category": {"$eq": "catalogs"}},
+    ),
+    Scenario(
+        "When is the mid-term exam for AI course?",
+        "When is the mid-term exam for the Artificial Intelligence course?",
+        "college_courses",
+        {"department": {"$eq": "Computer Science"}},
+    ),
+)
 
 
 def run_step6_tests() -> None:
@@ -57,36 +101,27 @@ def run_step6_tests() -> None:
         print("❌ No collections available. Run: python -m utils.setup_vectordb")
         return
 
-    scenarios = [
-        {
-            "title": "Who is the HOD of Computer Science?",
-            "query": "Who is the head of department for Computer Science?",
-            "collection": "faculty_info",
-            "where": {"department": {"$eq": "Computer Science"}},
-        },
-        {
-            "title": "What is the syllabus for Database Management?",
-            "query": "What is the syllabus for the Database Management course?",
-            "collection": "college_courses",
-            "where": {"category": {"$eq": "catalogs"}},
-        },
-        {
-            "title": "When is the mid-term exam for AI course?",
-            "query": "When is the mid-term exam for the Artificial Intelligence course?",
-            "collection": "college_courses",
-            "where": {"department": {"$eq": "Computer Science"}},
-        },
-    ]
-
-    for scenario in scenarios:
-        _run_single_query(
-            retriever=retriever,
-            title=scenario["title"],
-            query=scenario["query"],
-            collection=scenario["collection"],
-            where_filter=scenario.get("where"),
-            top_k=3,
-        )
+    # All scenario queries go through the embedder as one batch.
+    embeddings = retriever.embed_queries([scenario.query for scenario in _STEP6_SCENARIOS])
+
+    # Scenarios are independent; Chroma's HNSW search releases the GIL, so run
+    # them concurrently and print reports in scenario order.
+    with ThreadPoolExecutor(max_workers=len(_STEP6_SCENARIOS)) as executor:
+        futures = [
+            executor.submit(
+                _run_single_query,
+                retriever=retriever,
+                title=scenario.title,
+                query=scenario.query,
+                collection=scenario.collection,
+                where_filter=scenario.where,
+                top_k=3,
+                query_embedding=embedding,
+            )
+            for scenario, embedding in zip(_STEP6_SCENARIOS, embeddings)
+        ]
+        for future in futures:
+            print(future.result())
 
 
 if __name__ == "__main__":
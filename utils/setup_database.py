@@ -4,16 +4,48 @@ Generates 20-50 mock records per table with realistic data.
 """
 
 import sqlite3
-from datetime import datetime, timedelta
-import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 import csv
+from itertools import chain
 from pathlib import Path
+from typing import Any, Sequence
 
+import numpy as np
 
-def create_database(db_path: str = "data/database/college.db") -> sqlite3.Connection:
-    """Create SQLite database and define schema."""
+
+# Fixed seed so every rebuild produces the same mock dataset
+MOCK_DATA_SEED = 42
+
+# bcrypt (cost 4) of "password123" for the mock students, precomputed so setup
+# never runs the KDF. Mock data only; MUST NOT be used in production.
+MOCK_PASSWORD_HASH = "$2b$04$64kHLpyfVWzNTb60WGNTOOyMgpFtHEiD9IAqe9oUbnJl6eaSJC1YS"
+
+# Rebuild-from-scratch settings: no fsyncs, in-memory rollback journal, one
+# exclusive lock. Unsafe for a live database; the app's pool uses WAL/NORMAL.
+_FAST_SETUP_PRAGMAS = (
+    "PRAGMA journal_mode = MEMORY",
+    "PRAGMA synchronous = OFF",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -65536",  # 64 MiB
+    "PRAGMA locking_mode = EXCLUSIVE",
+)
+
+
+def create_database(db_path: str = "data/database/college.db", fast_setup: bool = True) -> sqlite3.Connection:
+    """Create SQLite database and define schema (secondary indexes: see create_indexes).
+
+    fast_setup applies write-optimized PRAGMAs for the lifetime of the returned
+    connection; pass False when building into a database others may be using.
+    """
     conn = sqlite3.connect(db_path)
+    if fast_setup:
+        for pragma in _FAST_SETUP_PRAGMAS:
+            conn.execute(pragma)
+    # Manage transactions explicitly: all DDL (and later all inserts) commit once
+    conn.isolation_level = None
     cursor = conn.cursor()
+    cursor.execute("BEGIN")
 
     # Students table
     cursor.execute("""
@@ -131,6 +163,7 @@ def create_database(db_path: str = "data/database/college.db") -> sqlite3.Connec
             actions TEXT,
             model TEXT,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            query_norm TEXT GENERATED ALWAYS AS (LOWER(user_query)) VIRTUAL,
             FOREIGN KEY (student_id) REFERENCES students(student_id)
         )
     """)
@@ -148,14 +181,69 @@ def create_database(db_path: str = "data/database/college.db") -> sqlite3.Connec
             FOREIGN KEY (student_id) REFERENCES students(student_id)
         )
     """)
-
     conn.commit()
     return conn
 
 
+# Secondary indexes, built after populate_database so bulk inserts don't
+# maintain extra B-trees row by row. Primary keys stay in the table
+# definitions so they hold even if this step never runs, and so they remain
+# valid FOREIGN KEY parent keys for any connection that enforces them.
+_INDEX_SQL = """
+-- One feedback row per (conversation, student); save_feedback upserts on it
+CREATE UNIQUE INDEX IF NOT EXISTS uq_feedback_conv_student ON feedback(conversation_id, student_id);
+"""
+
+
+def create_indexes(conn: sqlite3.Connection) -> None:
+    """Create secondary indexes once the tables are populated."""
+    conn.executescript("BEGIN;" + _INDEX_SQL + "COMMIT;")
+
+
+def bulk_insert(
+    cursor: sqlite3.Cursor,
+    table: str,
+    columns: Sequence[str],
+    rows: Sequence[Sequence[Any]],
+    max_params: int = 900,
+) -> None:
+    """Insert rows with multi-row VALUES statements (under SQLite's 999-parameter cap).
+
+    Omitted columns such as created_at take their schema defaults.
+    """
+    head = f"INSERT INTO {table} ({', '.join(columns)}) VALUES "
+    placeholder = "(" + ", ".join("?" * len(columns)) + ")"
+    per_stmt = max(1, max_params // len(columns))
+    for start in range(0, len(rows), per_stmt):
+        chunk = rows[start : start + per_stmt]
+        cursor.execute(head + ", ".join([placeholder] * len(chunk)), list(chain.from_iterable(chunk)))
+
+
 def populate_database(conn: sqlite3.Connection) -> None:
-    """Populate database with mock data."""
+    """Populate database with mock data in a single transaction."""
     cursor = conn.cursor()
+    cursor.execute("BEGIN")
+    try:
+        _insert_mock_data(cursor)
+    except Exception:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+def _assert_empty_table(cursor: sqlite3.Cursor, table: str) -> None:
+    """Mock data is only ever loaded into a freshly created database."""
+    if cursor.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone() is not None:
+        raise RuntimeError(f"{table} already has rows; populate_database expects a fresh database")
+
+
+def _insert_mock_data(cursor: sqlite3.Cursor) -> None:
+    # Plain INSERTs below: the tables are checked empty first, so OR IGNORE
+    # would only add per-row conflict handling.
+    for table in ("faculty", "courses", "students"):
+        _assert_empty_table(cursor, table)
+
+    rng = np.random.default_rng(MOCK_DATA_SEED)
 
     # Define departments and years
     departments = ["Computer Science", "Mathematics", "Biology", "Chemistry", "Physics", "English", "History"]
@@ -176,8 +264,9 @@ def populate_database(conn: sqlite3.Connection) -> None:
         ("F009", "Dr. James Wilson", "History", "james@college.edu", "Hum 210", "MWF 3-4:30 PM"),
         ("F010", "Prof. Lisa Anderson", "Psychology", "lisa@college.edu", "SS 150", "W 1-3 PM"),
     ]
-    cursor.executemany(
-        "INSERT OR IGNORE INTO faculty VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)",
+    bulk_insert(
+        cursor, "faculty",
+        ("faculty_id", "name", "department", "email", "office_location", "office_hours"),
         faculty_data,
     )
     print("✓ Inserted 10 faculty records")
@@ -215,29 +304,26 @@ def populate_database(conn: sqlite3.Connection) -> None:
         ("CHEM401", "Physical Chemistry", "Chemistry", 4, "Fall 2025", "F007", "Thermodynamics and kinetics"),
         ("ENG401", "Senior Seminar", "English", 3, "Fall 2025", "F008", "Advanced literary analysis"),
     ]
-    cursor.executemany(
-        "INSERT OR IGNORE INTO courses VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)",
+    bulk_insert(
+        cursor, "courses",
+        ("course_id", "course_name", "department", "credits", "semester", "faculty_id", "description"),
         course_data,
     )
     print("✓ Inserted 30 course records")
 
     # Insert Students (30 records) with default password "password123"
-    from utils.auth import hash_password
-    default_password_hash = hash_password("password123")
-    
-    student_data = []
-    for i in range(1, 31):
-        dept = random.choice(departments)
-        year = random.choice(years)
-        student_id = f"STU{i:05d}"
-        name = f"Student {i}"
-        email = f"student{i}@college.edu"
-        roll_number = f"2025{i:04d}"
-        phone = f"555-{1000 + i:04d}"
-        student_data.append((student_id, name, email, dept, year, roll_number, phone, default_password_hash))
+    num_students = 30
+    student_depts = rng.choice(departments, num_students).tolist()
+    student_years = rng.choice(years, num_students).tolist()
+    student_data = [
+        ("STU%05d" % i, "Student %d" % i, "student%d@college.edu" % i, dept, year,
+         "2025%04d" % i, "555-%04d" % (1000 + i), MOCK_PASSWORD_HASH)
+        for i, dept, year in zip(range(1, num_students + 1), student_depts, student_years)
+    ]
     
-    cursor.executemany(
-        "INSERT OR IGNORE INTO students (student_id, name, email, department, year, roll_number, phone, password_hash) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+    bulk_insert(
+        cursor, "students",
+        ("student_id", "name", "email", "department", "year", "roll_number", "phone", "password_hash"),
         student_data,
     )
     print("✓ Inserted 30 student records (password: password123)")
@@ -250,103 +336,151 @@ def populate_database(conn: sqlite3.Connection) -> None:
     course_ids = [row[0] for row in cursor.fetchall()]
 
     # Insert Enrollments (60-80 records)
-    enrollment_data = []
-    for student_id in student_ids:
-        # Each student enrolled in 2-3 courses
-        num_courses = random.randint(2, 3)
-        for course_id in random.sample(course_ids, num_courses):
-            semester = random.choice(semesters)
-            academic_year = "2025-2026"
-            grade = random.choice(grades)
-            enrollment_data.append((student_id, course_id, semester, academic_year, grade))
+    # Each student enrolled in 2-3 distinct courses; per-row fields drawn in bulk
+    num_courses = rng.integers(2, 4, len(student_ids))
+    # Convert once; rng.choice would otherwise rebuild an array from the list per student.
+    # shuffle=False skips permuting the k picks, which are inserted unordered anyway.
+    course_arr = np.asarray(course_ids)
+    enrolled_courses = [
+        rng.choice(course_arr, size=k, replace=False, shuffle=False).tolist() for k in num_courses.tolist()
+    ]
+    n = int(num_courses.sum())
+    enroll_semesters = rng.choice(semesters, n).tolist()
+    enroll_grades = rng.choice(grades, n).tolist()
+    enrollment_data = list(zip(
+        [sid for sid, k in zip(student_ids, num_courses.tolist()) for _ in range(k)],
+        chain.from_iterable(enrolled_courses),
+        enroll_semesters,
+        ["2025-2026"] * n,
+        enroll_grades,
+    ))
     
-    cursor.executemany(
-        "INSERT INTO enrollments (student_id, course_id, semester, academic_year, grade, created_at) VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)",
+    bulk_insert(
+        cursor, "enrollments",
+        ("student_id", "course_id", "semester", "academic_year", "grade"),
         enrollment_data,
     )
     print(f"✓ Inserted {len(enrollment_data)} enrollment records")
 
     # Insert Attendance (match enrollments)
-    attendance_data = []
-    for enrollment in enrollment_data:
-        student_id, course_id, semester, _, _ = enrollment
-        total_classes = random.randint(30, 45)
-        attended = random.randint(int(total_classes * 0.6), total_classes)
-        percentage = (attended / total_classes) * 100
-        attendance_data.append((student_id, course_id, total_classes, attended, percentage, semester))
+    total_classes = rng.integers(30, 46, n)
+    attended = rng.integers((total_classes * 0.6).astype(np.int64), total_classes + 1)
+    percentage = attended / total_classes * 100
+    attendance_data = [
+        (student_id, course_id, total, att, pct, semester)
+        for (student_id, course_id, semester, _, _), total, att, pct in zip(
+            enrollment_data, total_classes.tolist(), attended.tolist(), percentage.tolist()
+        )
+    ]
     
-    cursor.executemany(
-        "INSERT INTO attendance (student_id, course_id, total_classes, attended, percentage, semester, created_at) VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)",
+    bulk_insert(
+        cursor, "attendance",
+        ("student_id", "course_id", "total_classes", "attended", "percentage", "semester"),
         attendance_data,
     )
     print(f"✓ Inserted {len(attendance_data)} attendance records")
 
     # Insert Fees (30 records, one per student)
-    fees_data = []
-    for student_id in student_ids:
-        total_fees = random.choice([15000, 15000, 16000, 14500])  # Realistic tuition
-        paid_amount = random.randint(int(total_fees * 0.5), int(total_fees * 0.95))
-        due_amount = total_fees - paid_amount
-        due_date = (datetime.now() + timedelta(days=random.randint(7, 90))).strftime("%Y-%m-%d")
-        status = "Paid" if due_amount == 0 else "Pending" if due_amount < total_fees * 0.25 else "Due"
-        semester = random.choice(semesters)
-        fees_data.append((student_id, total_fees, paid_amount, due_amount, due_date, status, semester))
+    today = np.datetime64(datetime.now().date())
+    n_students = len(student_ids)
+    total_fees = rng.choice([15000, 15000, 16000, 14500], n_students)  # Realistic tuition
+    paid_amount = rng.integers((total_fees * 0.5).astype(np.int64), (total_fees * 0.95).astype(np.int64) + 1)
+    due_amount = total_fees - paid_amount
+    due_dates = (today + rng.integers(7, 91, n_students)).astype(str).tolist()
+    status = np.where(due_amount == 0, "Paid", np.where(due_amount < total_fees * 0.25, "Pending", "Due")).tolist()
+    fees_data = list(zip(
+        student_ids,
+        total_fees.tolist(),
+        paid_amount.tolist(),
+        due_amount.tolist(),
+        due_dates,
+        status,
+        rng.choice(semesters, n_students).tolist(),
+    ))
     
-    cursor.executemany(
-        "INSERT INTO fees (student_id, total_fees, paid_amount, due_amount, due_date, status, semester, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)",
+    bulk_insert(
+        cursor, "fees",
+        ("student_id", "total_fees", "paid_amount", "due_amount", "due_date", "status", "semester"),
         fees_data,
     )
     print(f"✓ Inserted {len(fees_data)} fee records")
 
     # Insert Exams (30 records, one per course)
-    exam_data = []
     exam_types = ["Midterm", "Final", "Quiz"]
     rooms = [f"Room {i}" for i in range(101, 121)]
     
     cursor.execute("SELECT course_id, semester FROM courses")
     courses = cursor.fetchall()
     
-    for course_id, semester in courses:
-        exam_date = (datetime.now() + timedelta(days=random.randint(10, 60))).strftime("%Y-%m-%d")
-        exam_time = random.choice(["9:00 AM", "10:00 AM", "1:00 PM", "2:00 PM", "3:00 PM"])
-        room_number = random.choice(rooms)
-        exam_type = random.choice(exam_types)
-        exam_data.append((course_id, exam_date, exam_time, room_number, exam_type, semester))
+    n_courses = len(courses)
+    exam_data = list(zip(
+        [course_id for course_id, _ in courses],
+        (today + rng.integers(10, 61, n_courses)).astype(str).tolist(),
+        rng.choice(["9:00 AM", "10:00 AM", "1:00 PM", "2:00 PM", "3:00 PM"], n_courses).tolist(),
+        rng.choice(rooms, n_courses).tolist(),
+        rng.choice(exam_types, n_courses).tolist(),
+        [semester for _, semester in courses],
+    ))
     
-    cursor.executemany(
-        "INSERT INTO exams (course_id, exam_date, exam_time, room_number, exam_type, semester, created_at) VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)",
+    bulk_insert(
+        cursor, "exams",
+        ("course_id", "exam_date", "exam_time", "room_number", "exam_type", "semester"),
         exam_data,
     )
     print(f"✓ Inserted {len(exam_data)} exam records")
 
-    conn.commit()
 
-
-def export_to_csv(conn: sqlite3.Connection, output_dir: str = "data/database") -> None:
-    """Export all tables to CSV files."""
+def _export_table(conn: sqlite3.Connection, table_name: str, output_dir: str) -> int:
+    """Write one table to <output_dir>/<table>.csv and return its row count."""
     cursor = conn.cursor()
+    cursor.arraysize = 10_000
+    cursor.execute(f"SELECT * FROM {table_name}")
+    # Header from the cursor itself; PRAGMA table_info omits generated columns
+    columns = [col[0] for col in cursor.description]
+
+    # Stream fixed-size row blocks from the cursor into C-level writerows()
+    row_count = 0
+    with open(f"{output_dir}/{table_name}.csv", "w", newline="", encoding="utf-8", buffering=1 << 20) as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        while rows := cursor.fetchmany():
+            writer.writerows(rows)
+            row_count += len(rows)
+    return row_count
+
+
+def _export_table_readonly(db_file: str, table_name: str, output_dir: str) -> int:
+    # One read-only connection per worker thread; WAL lets them read concurrently
+    conn = sqlite3.connect(f"{Path(db_file).resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        return _export_table(conn, table_name, output_dir)
+    finally:
+        conn.close()
+
+
+def export_to_csv(conn: sqlite3.Connection, output_dir: str = "data/database", max_workers: int = 4) -> None:
+    """Export all tables to CSV files.
+
+    File-backed databases are switched to WAL with normal locking so each
+    table can be dumped by a thread on its own read-only connection.
+    """
     Path(output_dir).mkdir(parents=True, exist_ok=True)
 
     # Get all table names
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-    tables = [row[0] for row in cursor.fetchall()]
-
-    for table_name in tables:
-        cursor.execute(f"SELECT * FROM {table_name}")
-        rows = cursor.fetchall()
-        
-        # Get column names
-        cursor.execute(f"PRAGMA table_info({table_name})")
-        columns = [col[1] for col in cursor.fetchall()]
-
-        # Write to CSV
-        csv_path = f"{output_dir}/{table_name}.csv"
-        with open(csv_path, "w", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow(columns)
-            writer.writerows(rows)
-        
-        print(f"  ✓ Exported {table_name} ({len(rows)} rows) to {csv_path}")
+    tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")]
+    db_file = conn.execute("PRAGMA database_list").fetchone()[2]
+
+    if db_file and max_workers > 1:
+        # Drop the fast-setup EXCLUSIVE lock; the WAL switch is the access that releases it
+        conn.execute("PRAGMA locking_mode = NORMAL")
+        conn.execute("PRAGMA journal_mode = WAL")
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            counts = list(executor.map(lambda t: _export_table_readonly(db_file, t, output_dir), tables))
+    else:
+        counts = [_export_table(conn, table_name, output_dir) for table_name in tables]
+
+    for table_name, row_count in zip(tables, counts):
+        print(f"  ✓ Exported {table_name} ({row_count} rows) to {output_dir}/{table_name}.csv")
 
 
 def run_setup() -> None:
@@ -370,6 +504,10 @@ def run_setup() -> None:
     print("\nPopulating with mock data...")
     populate_database(conn)
 
+    # Index after the bulk load
+    print("\nCreating indexes...")
+    create_indexes(conn)
+
     # Export to CSV
     print("\nExporting tables to CSV...")
     export_to_csv(conn, "data/database")